@@ -1,15 +1,134 @@
 """
 
 """
+from collections import OrderedDict
+from functools import partial
+from numbers import Integral
+import warnings
+
 import numpy as np
 from scipy.spatial.distance import pdist
 from scipy.optimize import curve_fit
-import matplotlib.pyplot as plt
+from numba import njit, prange
+from numba import config, get_num_threads, set_num_threads
 import inspect
 
 from skgstat import binning, estimators, Variogram, stmodels, plotting
 
 
+def _triu_pairs(n):
+    """
+    Return the upper triangle index pairs of n points as two read-only,
+    C-contiguous int32 arrays. The pairs are ordered like the flat
+    distance matrix returned by pdist.
+
+    """
+    pairs = tuple(np.ascontiguousarray(idx, dtype=np.int32)
+                  for idx in np.triu_indices(n, k=1))
+    for idx in pairs:
+        idx.flags.writeable = False
+    return pairs
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _calc_diff_nb(values, out):
+    """
+    Fill out with the absolute pairwise differences of all space and time
+    point pairs in values. The row and column index of each pair is derived
+    from the closed form of the flattened upper triangle, thus each space
+    point writes a disjoint set of rows and the outer loop can run parallel.
+    The function is compiled on first use, not on import, as only
+    _calc_diff needs it. out has to be of the same dtype as values.
+
+    """
+    m, n = values.shape
+
+    for xi in prange(m):
+        # first row of location xi, the rows of all xi are disjoint
+        xstart = xi * (2 * m - xi - 1) // 2
+        for xj in range(xi + 1, m):
+            row = xstart + (xj - xi - 1)
+            for ti in range(n):
+                tstart = ti * (2 * n - ti - 1) // 2
+                for tj in range(ti + 1, n):
+                    out[row, tstart + (tj - ti - 1)] = \
+                        abs(values[xi, ti] - values[xj, tj])
+
+
+@njit(parallel=True, cache=True)
+def _lag_class_reduce_nb(values, i, j, x_starts, x_groups,
+                         ti, tj, t_starts, t_groups, kind, out):
+    """
+    Estimate the semi-variance of the space and time lag classes given by
+    x_groups and t_groups directly from values. The point pairs (i, j) and
+    (ti, tj) have to be ordered by lag class group, the pairs of group x
+    are i[x_starts[x]:x_starts[x + 1]]. The pairwise differences
+    of a lag class are reduced while they are generated and never stored.
+    out has to be of shape (len(x_groups), len(t_groups)). kind selects
+    the estimator: 0 matheron, 1 cressie and 2 minmax.
+    values can be float64 or float32, the differences are always reduced
+    in float64. No fastmath is used, in order to keep the NaN semantics of
+    the estimators.
+
+    """
+    xn, tn = out.shape
+
+    for cell in prange(xn * tn):
+        r = cell // tn
+        c = cell % tn
+        x = x_groups[r]
+        t = t_groups[c]
+
+        # lag classes without a group have no members
+        if x < 0 or x >= len(x_starts) - 1 or t < 0 or t >= len(t_starts) - 1:
+            out[r, c] = np.nan
+            continue
+
+        n = 0
+        acc = 0.
+        valid = 0
+        mn = np.inf
+        mx = -np.inf
+        for a in range(x_starts[x], x_starts[x + 1]):
+            xi = i[a]
+            xj = j[a]
+            for b in range(t_starts[t], t_starts[t + 1]):
+                # always accumulate in float64, also for float32 values
+                d = float(abs(values[xi, ti[b]] - values[xj, tj[b]]))
+                n += 1
+                if kind == 0:
+                    acc += d * d
+                elif kind == 1:
+                    acc += np.sqrt(d)
+                elif d == d:
+                    # minmax ignores NaN, like nanmin, nanmax and nanmean
+                    acc += d
+                    valid += 1
+                    mn = min(mn, d)
+                    mx = max(mx, d)
+
+        # finalize the estimator
+        if n == 0:
+            out[r, c] = np.nan
+        elif kind == 0:
+            out[r, c] = acc / (2 * n)
+        elif kind == 1:
+            out[r, c] = (acc / n) ** 4 / \
+                (2 * (0.457 + (0.494 / n) + (0.045 / n**2)))
+        elif valid == 0:
+            out[r, c] = np.nan
+        else:
+            out[r, c] = (mx - mn) / (acc / valid)
+
+
+# estimators with a fused implementation in _lag_class_reduce_nb
+_FUSED_ESTIMATORS = {
+    estimators.matheron: 0,
+    estimators.cressie: 1,
+    estimators.minmax: 2
+}
+
+
 class SpaceTimeVariogram:
     """
 
@@ -27,7 +146,8 @@ class SpaceTimeVariogram:
                  estimator='matheron',
                  use_nugget=False,
                  model='product-sum',
-                 verbose=False
+                 verbose=False,
+                 n_jobs=None
                  ):
         # set coordinates array
         self._X = np.asarray(coordinates)
@@ -35,6 +155,22 @@ class SpaceTimeVariogram:
         # combined pairwise differences
         self._diff = None
 
+        # cached experimental variogram and bin meshgrid
+        self._experimental = None
+        self._experimental_f32 = None
+        self._marginal_cache = {}
+        self._meshbins = None
+
+        # number of threads used by the numba kernels
+        self._n_jobs = None
+        self.n_jobs = n_jobs
+
+        # upper triangle index pairs for space (i, j) and time (ti, tj)
+        self._i = None
+        self._j = None
+        self._ti = None
+        self._tj = None
+
         # set verbosity, not implemented yet
         self.verbose = verbose
 
@@ -52,9 +188,13 @@ class SpaceTimeVariogram:
         self._xdist = None
         self._tdist = None
 
+        # cached reductions of the space distance matrix
+        self._xdist_stats = {}
+
         # set distance calculation functions
         self._xdist_func = None
         self._tdist_func = None
+        self._tdist_func_name = None
         self.set_xdist_func(func_name=xdist_func)
         self.set_tdist_func(func_name=tdist_func)
 
@@ -75,6 +215,8 @@ class SpaceTimeVariogram:
         self._xbin_func = None
         self._xbin_func_name = None
         self._xgroups = None
+        self._x_group_pairs = None
+        self._x_starts = None
         self._xbins = None
         self.set_bin_func(bin_func=xbins, axis='space')
 
@@ -82,6 +224,8 @@ class SpaceTimeVariogram:
         self._tbin_func = None
         self._tbin_func_name = None
         self._tgroups = None
+        self._t_group_pairs = None
+        self._t_starts = None
         self._tbins = None
         self.set_bin_func(bin_func=tbins, axis='time')
 
@@ -94,6 +238,17 @@ class SpaceTimeVariogram:
         self.set_model(model_name=model)
         self._model_params = {}
 
+        # cached triangulations and interpolated grids for plotting
+        self._bin_tri = None
+        self._precise_interp_cache = None
+        self._cubic_interp = None
+        self._zi_cache = OrderedDict()
+        self._mpl_tri = None
+        self._last_lev = None
+        # ContourSet of the last 2D plot, this keeps its figure alive until
+        # the next 2D plot or the variogram is deleted
+        self._last_contourset = None
+
         # _x and values are set, build the marginal Variogram objects
         # marginal space variogram
         self.create_XMarginal()
@@ -104,6 +259,41 @@ class SpaceTimeVariogram:
         # fit the model with forced preprocessing
         #self.fit(force=True)
 
+    def __getstate__(self):
+        """
+        Drop the plotting caches, as they can be much larger than the
+        variogram itself and reference matplotlib objects. They are rebuilt
+        on the next plot.
+
+        """
+        state = self.__dict__.copy()
+        state['_bin_tri'] = None
+        state['_precise_interp_cache'] = None
+        state['_cubic_interp'] = None
+        state['_zi_cache'] = OrderedDict()
+        state['_mpl_tri'] = None
+        state['_last_lev'] = None
+        state['_last_contourset'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+        # unpickled arrays are writeable again, protect all cached arrays
+        cached = [
+            self._values, self._experimental, self._experimental_f32,
+            self._i, self._j, self._ti, self._tj,
+            self._xgroups, self._x_starts, self._tgroups, self._t_starts
+        ]
+        for pairs in (self._x_group_pairs, self._t_group_pairs, self._meshbins):
+            if pairs is not None:
+                cached.extend(pairs)
+        cached.extend(self._marginal_cache.values())
+
+        for arr in cached:
+            if arr is not None:
+                arr.flags.writeable = False
+
     # ----------------------------------------------------------------------- #
     #                        ATTRIBUTE SETTING                                #
     # ----------------------------------------------------------------------- #
@@ -121,16 +311,36 @@ class SpaceTimeVariogram:
         values : numpy.array
             Returns a two dimensional array of all observations. The first
             dimension (rows) matches the coordinate array and the second axis
-            contains the time series for each observation point.
+            contains the time series for each observation point. The
+            array is read-only, use
+            :func:`set_values <skgstat.SpaceTimeVariogram.set_values>` to
+            change the observations.
 
         """
         return self._values
 
-    def set_values(self, values):
+    def set_values(self, values, dtype=None):
         """Set new values
 
         The values should be an (m, n) array with m matching the size of
         coordinates first  dimension and n is the time dimension.
+        The values are stored as a read-only, C-contiguous copy of the given
+        dtype, thus all pairwise difference calculations work on a
+        predictable memory layout and dtype and the cached results cannot
+        get out of sync with the values.
+
+        Parameters
+        ----------
+        values : numpy.array
+            Array of shape (m, n) holding a time series for each location.
+        dtype : numpy.dtype, None
+            Floating point type used to store the values. Can be either
+            numpy.float64 or numpy.float32. If None (default), the dtype is
+            inferred from the values: floating point inputs of 32 bit or
+            less (float16, float32) are stored as float32, integer and all
+            other inputs are stored as float64. float32 halves
+            the memory traffic of all pairwise difference calculations.
+            The semi-variance estimators still accumulate in float64.
 
         Raises
         ------
@@ -138,15 +348,31 @@ class SpaceTimeVariogram:
             dimensionality
         AttributeError : in case values cannot be converted to a numpy.array
 
+        Notes
+        -----
+        Only the cached results depending on the values are dismissed. The
+        space distances, binning and groups depend on the coordinates only
+        and are kept. The time distances, binning and groups are only
+        dismissed if the length of the time series changed.
+
         """
         values = np.asarray(values)
 
-        # check dtype
-        if not isinstance(values, np.ndarray) or \
-                (values.dtype is not np.dtype(float) and
-                 values.dtype is not np.dtype(int)):
+        # check dtype, any real number is fine
+        if not (np.issubdtype(values.dtype, np.integer) or
+                np.issubdtype(values.dtype, np.floating)):
             raise AttributeError('values cannot be converted to a proper '
                                  '(m,n) shaped array.')
+
+        # check the storage dtype
+        if dtype is None:
+            if np.issubdtype(values.dtype, np.floating) and values.dtype.itemsize <= 4:
+                dtype = np.float32
+            else:
+                dtype = np.float64
+        dtype = np.dtype(dtype)
+        if dtype not in (np.dtype(np.float64), np.dtype(np.float32)):
+            raise ValueError('dtype has to be one of float64, float32.')
         # check shape
         try:
             m, n = values.shape
@@ -159,11 +385,31 @@ class SpaceTimeVariogram:
             raise ValueError('A SpaceTimeVariogram needs more than one '
                              'observation on the time axis.')
 
+        # the time axis changes, if the length of the time series changes
+        time_changed = self._values is not None and self._values.shape[1] != n
+
         # save new values
-        self._values = values
+        self._values = np.array(values, dtype=dtype, order='C')
+        self._values.flags.writeable = False
+
+        # the space pairs only depend on the number of locations
+        if self._i is None:
+            self._i, self._j = _triu_pairs(m)
 
-        # dismiss the pairwise differences, and lags
+        # dismiss the pairwise differences, experimental variogram and fitting
         self._diff = None
+        self._experimental = None
+        self._experimental_f32 = None
+        self._marginal_cache = {}
+        self.cof, self.cov = None, None
+
+        # dismiss everything derived from the time axis
+        if time_changed:
+            self._ti, self._tj = None, None
+            self._tdist = None
+            self._tbins = None
+            self._meshbins = None
+            self._tgroups = None
 
         # recreate the space marginal variogram
         if self.XMarginal is not None:
@@ -175,6 +421,43 @@ class SpaceTimeVariogram:
     def values(self, new_values):
         self.set_values(values=new_values)
 
+    @property
+    def n_jobs(self):
+        """Number of threads
+
+        The number of threads used by the parallel numba kernels, which
+        calculate the pairwise differences and the fused estimators. If
+        None (default), numba's default is used, which is usually the
+        number of CPU cores. The value is limited to the
+        ``NUMBA_NUM_THREADS`` environment variable.
+
+        """
+        return self._n_jobs
+
+    @n_jobs.setter
+    def n_jobs(self, n):
+        if n is not None:
+            if not isinstance(n, Integral) or isinstance(n, bool) or n < 1:
+                raise ValueError('n_jobs has to be None or a positive integer.')
+            n = int(n)
+        self._n_jobs = n
+
+    def _call_kernel(self, kernel, *args):
+        """
+        Call the given numba kernel with args using n_jobs threads. The
+        previous number of threads is restored afterwards.
+
+        """
+        if self.n_jobs is None:
+            return kernel(*args)
+
+        previous = get_num_threads()
+        set_num_threads(min(self.n_jobs, config.NUMBA_NUM_THREADS))
+        try:
+            return kernel(*args)
+        finally:
+            set_num_threads(previous)
+
     @property
     def xdist_func(self):
         return self._xdist_func
@@ -203,12 +486,20 @@ class SpaceTimeVariogram:
 
         """
         if isinstance(func_name, str):
-            self._xdist_func = lambda x: pdist(x, metric=func_name)
+            self._xdist_func = partial(pdist, metric=func_name)
         else:
             raise ValueError('For now only str arguments are supported.')
 
-        # reset the distances
+        # reset the distances, binning and fitting
         self._xdist = None
+        self._xdist_stats = {}
+        self._xbins = None
+        self._meshbins = None
+        self._xgroups = None
+        self._experimental = None
+        self._experimental_f32 = None
+        self._marginal_cache = {}
+        self.cof, self.cov = None, None
 
         # update marignal
         self._set_xmarg_params()
@@ -241,12 +532,20 @@ class SpaceTimeVariogram:
 
         """
         if isinstance(func_name, str):
-            self._tdist_func = lambda t: pdist(t, metric=func_name)
+            self._tdist_func = partial(pdist, metric=func_name)
+            self._tdist_func_name = func_name.lower()
         else:
             raise ValueError('For now only str arguments are supported.')
 
-        # reset the distances
+        # reset the distances, binning and fitting
         self._tdist = None
+        self._tbins = None
+        self._meshbins = None
+        self._tgroups = None
+        self._experimental = None
+        self._experimental_f32 = None
+        self._marginal_cache = {}
+        self.cof, self.cov = None, None
 
         # update marignal
         self._set_tmarg_params()
@@ -305,6 +604,39 @@ class SpaceTimeVariogram:
         self.__calc_tdist(force=False)
         return self._tdist
 
+    @property
+    def x_pairs(self):
+        """Point pairs (space)
+
+        Returns the index of the first and second location of each point
+        pair. The pairs are aligned to
+        :func:`xdistance <skgstat.SpaceTimeVariogram.xdistance>`. The
+        arrays are cached, read-only and of type int32.
+
+        Returns
+        -------
+        pairs : (numpy.array, numpy.array)
+
+        """
+        return self._i, self._j
+
+    @property
+    def t_pairs(self):
+        """Point pairs (time)
+
+        Returns the index of the first and second time step of each point
+        pair. The pairs are aligned to
+        :func:`tdistance <skgstat.SpaceTimeVariogram.tdistance>`. The
+        arrays are cached, read-only and of type int32.
+
+        Returns
+        -------
+        pairs : (numpy.array, numpy.array)
+
+        """
+        self.__calc_tdist(force=False)
+        return self._ti, self._tj
+
     @property
     def x_lags(self):
         if self._x_lags is None:
@@ -321,7 +653,11 @@ class SpaceTimeVariogram:
 
         # reset bins and groups
         self._xbins = None
+        self._meshbins = None
         self._xgroups = None
+        self._experimental = None
+        self._experimental_f32 = None
+        self._marginal_cache = {}
 
         # update marignal
         self._set_xmarg_params()
@@ -345,7 +681,11 @@ class SpaceTimeVariogram:
 
         # reset bins
         self._tbins = None
+        self._meshbins = None
         self._tgroups = None
+        self._experimental = None
+        self._experimental_f32 = None
+        self._marginal_cache = {}
 
         # update marignal
         self._set_tmarg_params()
@@ -361,24 +701,50 @@ class SpaceTimeVariogram:
 
         # remove binning
         self._xbins = None
+        self._meshbins = None
         self._xgroups = None
+        self._experimental = None
+        self._experimental_f32 = None
+        self._marginal_cache = {}
 
         # set the new value
         if value is None:
             self._maxlag = None
         elif isinstance(value, str):
             if value == 'median':
-                self._maxlag = np.median(self.xdistance)
+                self._maxlag = self._get_xdist_stat('median')
             elif value == 'mean':
-                self._maxlag = np.mean(self.xdistance)
+                self._maxlag = self._get_xdist_stat('mean')
         elif value < 1:
-            self._maxlag = value * np.max(self.xdistance)
+            self._maxlag = value * self._get_xdist_stat('max')
         else:
             self._maxlag = value
 
         # update marignal
         self._set_xmarg_params()
 
+    def _get_xdist_stat(self, stat):
+        """Cached reduction of the space distance matrix
+
+        Returns the given numpy reduction of
+        :func:`xdistance <skgstat.SpaceTimeVariogram.xdistance>`. The
+        result is cached until the space distances are recalculated.
+
+        Parameters
+        ----------
+        stat : str
+            Name of the numpy reduction. Can be one of 'max', 'median' or
+            'mean'.
+
+        Returns
+        -------
+        value : float
+
+        """
+        if stat not in self._xdist_stats:
+            self._xdist_stats[stat] = getattr(np, stat)(self.xdistance)
+        return self._xdist_stats[stat]
+
     def set_bin_func(self, bin_func, axis):
         """Set binning function
 
@@ -411,11 +777,11 @@ class SpaceTimeVariogram:
         elif bin_func.lower() == 'uniform':
             f = binning.uniform_count_lags
         elif isinstance(bin_func, str):
-            # define a wrapper to pass the name
-            def wrapper(distances, n, maxlag):
-                return binning.auto_derived_lags(distances, bin_func.lower(), maxlag)
-
-            f = wrapper
+            # define a picklable wrapper to pass the name
+            f = partial(
+                binning._auto_derived_lags_wrapper,
+                method_name=bin_func.lower()
+            )
             adjust_n_lags = True
         else:
             raise ValueError('%s binning method is not known' % bin_func)
@@ -433,7 +799,11 @@ class SpaceTimeVariogram:
 
             # reset
             self._xgroups = None
+            self._experimental = None
+            self._experimental_f32 = None
+            self._marginal_cache = {}
             self._xbins = None
+            self._meshbins = None
 
         elif axis.lower() == 'time' or axis.lower() == 't':
             self._tbin_func = f
@@ -447,7 +817,11 @@ class SpaceTimeVariogram:
 
             # reset
             self._tgroups = None
+            self._experimental = None
+            self._experimental_f32 = None
+            self._marginal_cache = {}
             self._tbins = None
+            self._meshbins = None
 
         else:
             raise ValueError('%s is not a valid axis' % axis)
@@ -492,8 +866,12 @@ class SpaceTimeVariogram:
         else:
             raise AttributeError('bin value cannot be parsed.')
 
-        # reset the groups
+        # reset the groups and the meshgrid
         self._xgroups = None
+        self._experimental = None
+        self._experimental_f32 = None
+        self._marginal_cache = {}
+        self._meshbins = None
 
         # update marignal
         self._set_xmarg_params()
@@ -536,15 +914,24 @@ class SpaceTimeVariogram:
         else:
             raise AttributeError('bin value cannot be parsed.')
 
-        # reset the groups
+        # reset the groups and the meshgrid
         self._tgroups = None
+        self._experimental = None
+        self._experimental_f32 = None
+        self._marginal_cache = {}
+        self._meshbins = None
 
         # update marignal
         self._set_tmarg_params()
 
     @property
     def meshbins(self):
-        return np.meshgrid(self.xbins, self.tbins)
+        # the meshgrid is cached until the bins change
+        if self._meshbins is None:
+            self._meshbins = np.meshgrid(self.xbins, self.tbins)
+            for grid in self._meshbins:
+                grid.flags.writeable = False
+        return self._meshbins
 
     @property
     def use_nugget(self):
@@ -570,8 +957,11 @@ class SpaceTimeVariogram:
         self.set_estimator(estimator_name=value)
 
     def set_estimator(self, estimator_name):
-        # reset the fitting
+        # reset the fitting and the experimental variogram
         self.cof, self.cov = None, None
+        self._experimental = None
+        self._experimental_f32 = None
+        self._marginal_cache = {}
 
         if isinstance(estimator_name, str):
             if estimator_name.lower() == 'matheron':
@@ -743,7 +1133,7 @@ class SpaceTimeVariogram:
         -------
         masK_array : numpy.array
             mask array that identifies the lag class group index for each pair
-            of points on the given axis.
+            of points on the given axis. The array is cached and read-only.
 
         """
         if not isinstance(axis, str):
@@ -770,33 +1160,32 @@ class SpaceTimeVariogram:
         Returns an iterator over all lag classes by aligning all time lags
         over all space lags. This means that it will yield all time lag groups
         for a space lag of index 0 at first and then iterate the space lags.
+        The pairwise differences are calculated on the fly for each lag
+        class, the full difference matrix is never built.
 
         Returns
         -------
         iterator
 
         """
-        # are differences already calculated
-        if self._diff is None:
-            self._calc_diff(force=False)
-
-        # get the group masking arrays
-        xgrp = self.lag_groups(axis='space')
-        tgrp = self.lag_groups(axis='time')
-
-        def diff_select(x, t):
-            return self._diff[np.where(xgrp == x)[0]][:, np.where(tgrp == t)[0]]
-
         # iterate
         for x in range(self.x_lags):
+            i, j = self._get_group_pairs(axis='space', lag=x)
             for t in range(self.t_lags):
-                yield diff_select(x, t).flatten()
+                ti, tj = self._get_group_pairs(axis='time', lag=t)
+                yield self._get_diff(i, j, ti, tj).ravel()
 
     def _get_experimental(self):
         # TODO: fix this
         if self.estimator.__name__ == 'entropy':
             raise NotImplementedError
 
+        # estimators that can be reduced while the differences are generated
+        if self.estimator in _FUSED_ESTIMATORS:
+            return self._fused_estimate(
+                np.arange(self.x_lags), np.arange(self.t_lags)
+            ).flatten()
+
         # this might
         z = np.fromiter(
             (self.estimator(vals) for vals in self.lag_classes()),
@@ -805,6 +1194,47 @@ class SpaceTimeVariogram:
 
         return z.copy()
 
+    def _fused_estimate(self, x_groups, t_groups):
+        """Fused semi-variance estimation
+
+        Calculate the semi-variance of the given space and time lag classes
+        with the numba compiled ``_lag_class_reduce_nb`` function. The
+        pairwise differences of each lag class are reduced while they are
+        generated, without any intermediate array. All lag classes are
+        handled in one call. Only available for the estimators listed in
+        ``_FUSED_ESTIMATORS``.
+
+        Parameters
+        ----------
+        x_groups : numpy.array
+            Indices of the space lag classes.
+        t_groups : numpy.array
+            Indices of the time lag classes.
+
+        Returns
+        -------
+        semivariance : numpy.array
+            Array of shape (len(x_groups), len(t_groups)).
+
+        """
+        # make sure the groupings and their point pairs are calculated
+        self.lag_groups(axis='space')
+        self.lag_groups(axis='time')
+
+        x_groups = np.asarray(x_groups, dtype=np.int64)
+        t_groups = np.asarray(t_groups, dtype=np.int64)
+
+        out = np.empty((len(x_groups), len(t_groups)))
+        self._call_kernel(
+            _lag_class_reduce_nb,
+            self.values,
+            *self._x_group_pairs, self._x_starts, x_groups,
+            *self._t_group_pairs, self._t_starts, t_groups,
+            _FUSED_ESTIMATORS[self.estimator], out
+        )
+
+        return out
+
     @property
     def experimental(self):
         """Experimental Variogram
@@ -820,8 +1250,36 @@ class SpaceTimeVariogram:
             Returns an two dimensional array of semivariances over space on
             the first axis and time over the second axis.
 
+        Notes
+        -----
+        The experimental variogram is cached and returned as a read-only
+        array. The cache is dismissed whenever the values, the estimator,
+        the distance functions or the binning of either axis change.
+
+        """
+        if self._experimental is None:
+            self._experimental = self._get_experimental()
+            self._experimental.flags.writeable = False
+        return self._experimental
+
+    @property
+    def experimental_f32(self):
+        """Experimental Variogram in single precision
+
+        Returns :func:`experimental <skgstat.SpaceTimeVariogram.experimental>`
+        as a read-only float32 array. The plotting functions use it to move
+        half the bytes through the interpolation. It is cached along with
+        the experimental variogram.
+
+        Returns
+        -------
+        variogram : numpy.ndarray
+
         """
-        return self._get_experimental()
+        if self._experimental_f32 is None:
+            self._experimental_f32 = self.experimental.astype(np.float32)
+            self._experimental_f32.flags.writeable = False
+        return self._experimental_f32
 
     def __calc_xdist(self, force=False):
         """Calculate distance in space
@@ -840,6 +1298,7 @@ class SpaceTimeVariogram:
         """
         if self._xdist is None or force:
             self._xdist = self.xdist_func(self._X)
+            self._xdist_stats = {}
 
     def __calc_tdist(self, force=False):
         """Calculate distance in time
@@ -855,8 +1314,25 @@ class SpaceTimeVariogram:
             If True, an eventually cached version of the distance matrix
             will be deleted.
 
+        Notes
+        -----
+        The time 'coordinates' are the integer time steps. For metrics that
+        reduce to the absolute difference of the time steps, the distances
+        are derived from the upper triangle indices directly and
+        :func:`pdist <scipy.spatial.distance.pdist>` is not called.
+
         """
+        # the time pairs only depend on the length of the time series
+        if self._ti is None or force:
+            self._ti, self._tj = _triu_pairs(self.values.shape[1])
+
         if self._tdist is None or force:
+            # time steps on a line: the distance is j - i for all pairs
+            if self._tdist_func_name in ('euclidean', 'cityblock',
+                                         'chebyshev', 'minkowski'):
+                self._tdist = (self._tj - self._ti).astype(float)
+                return
+
             # extract the timestamps
             t = np.stack((
                 np.arange(self.values.shape[1]),
@@ -864,6 +1340,70 @@ class SpaceTimeVariogram:
             ), axis=1)
             self._tdist = self.tdist_func(t)
 
+    def _get_group_pairs(self, axis, lag):
+        """Point pairs of a lag class group
+
+        Returns the point pairs on the given axis, that fall into the lag
+        class of index lag. The point pairs are stored ordered by lag class
+        group along with the grouping itself, thus the pairs of a group
+        are a contiguous slice.
+
+        Parameters
+        ----------
+        axis : str
+            Can either be 'space' or 'time'.
+        lag : int
+            Index of the lag class group.
+
+        Returns
+        -------
+        pairs : tuple
+            Tuple of two numpy.arrays holding the index of the first and
+            the second point of each pair.
+
+        """
+        # make sure the grouping and its pairs are calculated
+        self.lag_groups(axis=axis)
+
+        if axis.lower() == 'space' or axis.lower() == 's':
+            (first, second), starts = self._x_group_pairs, self._x_starts
+        else:
+            (first, second), starts = self._t_group_pairs, self._t_starts
+
+        # unknown lag classes have no members
+        if lag < 0 or lag >= len(starts) - 1:
+            return first[:0], second[:0]
+
+        members = slice(starts[lag], starts[lag + 1])
+        return first[members], second[members]
+
+    def _get_diff(self, i, j, ti, tj):
+        """Pairwise differences of a subset of point pairs
+
+        Calculate the absolute pairwise differences for the space pairs
+        (i, j) and the time pairs (ti, tj).
+
+        Parameters
+        ----------
+        i, j : numpy.array
+            Index of the first and second location of each space pair.
+        ti, tj : numpy.array
+            Index of the first and second time step of each time pair.
+
+        Returns
+        -------
+        diff : numpy.array
+            Array of shape (len(i), len(ti)) holding the pairwise
+            differences.
+
+        """
+        # gather both sides of the pairs in one 2D index each and
+        # calculate the absolute difference in place
+        v = self.values
+        diff = v[np.ix_(i, ti)]
+        np.subtract(diff, v[np.ix_(j, tj)], out=diff)
+        return np.abs(diff, out=diff)
+
     def _calc_diff(self, force=False):
         """Calculate pairwise differences
 
@@ -882,12 +1422,14 @@ class SpaceTimeVariogram:
 
         Notes
         -----
-        This is a Python only implementation that can get quite slow as any
-        added obervation on the space or time axis will increase the matrix
-        dimension by one. It is also slow as 4 loops are needed to loop the
-        matrix. I am evaluating at the moment if the function performs better
-        using numpys vectorizations or by implementing a Cython, Fortran,
-        Rust lib that can do the heavy stuff.
+        The differences are calculated by the numba compiled
+        ``_calc_diff_nb`` function, which writes directly into the
+        preallocated result matrix. The loop over the space axis is
+        parallelized.
+        The experimental variogram does not depend on this matrix, as
+        :func:`lag_classes <skgstat.SpaceTimeVariogram.lag_classes>`
+        calculates the differences for each lag class on demand. As the
+        matrix can get very large, it is not built during preprocessing.
 
         """
         # check the force
@@ -895,27 +1437,13 @@ class SpaceTimeVariogram:
             return
 
         # get size of distance matrices
-        xn = self.xdistance.size
-        tn = self.tdistance.size
+        m, n = self.values.shape
+        xn = m * (m - 1) // 2
+        tn = n * (n - 1) // 2
 
-        # get outer and inner iterators
-        outer, inner = self.values.shape
-        v = self.values
-
-        # prepare TODO: here the Fortran, Rust, whatever calc
-        self._diff = np.zeros((xn, tn)) * np.nan
-
-        xidx = 0
-        for xi in range(outer):
-            for xj in range(outer):
-                if xi < xj:
-                    tidx = 0
-                    for ti in range(inner):
-                        for tj in range(inner):
-                            if ti < tj:
-                                self._diff[xidx][tidx] = np.abs(v[xi, ti] - v[xj, tj])
-                                tidx += 1
-                    xidx += 1
+        # calculate all pairwise differences into the result matrix
+        self._diff = np.empty((xn, tn), dtype=self.values.dtype)
+        self._call_kernel(_calc_diff_nb, self.values, self._diff)
 
     def _calc_group(self, axis, force=False):
         """Calculate lag class grouping
@@ -959,15 +1487,34 @@ class SpaceTimeVariogram:
         bins = getattr(self, '%sbins' % fmt)
         d = getattr(self, '%sdistance' % fmt)
 
-        # set all groups to -1
-        grp = np.ones(len(d), dtype=int) * -1
+        # go for the classification, the i-th group is (bins[i-1], bins[i]]
+        grp = np.digitize(d, bins, right=True)
+
+        # set all distances outside (0, bins[-1]] to -1
+        grp[~((d > 0) & (d <= bins[-1]))] = -1
+
+        # build a stable sorted index, the members of group i are found in
+        # index[starts[i]:starts[i + 1]]
+        index = np.argsort(grp, kind='stable')
+        starts = np.searchsorted(grp[index], np.arange(len(bins) + 1))
+
+        # reorder the point pairs by group. The upper triangle is ordered by
+        # the first point and the sort is stable, thus the pairs within
+        # a group are still ordered by their first point
+        if fmt == 'x':
+            first, second = self.x_pairs
+        else:
+            first, second = self.t_pairs
+        pairs = (first[index], second[index])
 
-        # go for the classification
-        for i, bounds in enumerate(zip([0] + list(bins), bins)):
-            grp[np.where((d > bounds[0]) & (d <= bounds[1]))] = i
+        # the grouping is cached, protect it from in-place edits
+        for arr in (grp, starts) + pairs:
+            arr.flags.writeable = False
 
         # save
         setattr(self, '_%sgroups' % fmt, grp)
+        setattr(self, '_%s_group_pairs' % fmt, pairs)
+        setattr(self, '_%s_starts' % fmt, starts)
 
     def preprocessing(self, force=False):
         """Preprocessing
@@ -984,10 +1531,16 @@ class SpaceTimeVariogram:
             clean calculation will be done.
 
         """
+        # dismiss the cached results derived from the groups
+        if force:
+            self._experimental = None
+            self._experimental_f32 = None
+            self._marginal_cache = {}
+            self._meshbins = None
+
         # recalculate distances
         self.__calc_xdist(force=force)
         self.__calc_tdist(force=force)
-        self._calc_diff(force=force)
         self._calc_group(axis='space', force=force)
         self._calc_group(axis='time', force=force)
 
@@ -1098,7 +1651,8 @@ class SpaceTimeVariogram:
         Returns
         -------
         variogram : numpy.array
-            Marginal variogram of the given axis
+            Marginal variogram of the given axis. The array is cached
+            along with the experimental variogram and is read-only.
 
         """
         # check the axis
@@ -1106,22 +1660,78 @@ class SpaceTimeVariogram:
             raise AttributeError('axis has to be of type string.')
 
         if axis.lower() == 'space' or axis.lower() == 's':
-            return np.fromiter(
+            axis = 'space'
+        elif axis.lower() == 'time' or axis.lower() == 't':
+            axis = 'time'
+        else:
+            raise ValueError("axis can either be 'space' or 'time'.")
+
+        # check if cached
+        key = (axis, lag)
+        if key in self._marginal_cache:
+            return self._marginal_cache[key]
+
+        # slice both marginals from an already cached experimental variogram
+        n_lags = min(self.x_lags, self.t_lags)
+        if self._experimental is not None and 0 <= lag < n_lags:
+            self._compute_marginals(lag=lag)
+            return self._marginal_cache[key]
+
+        # otherwise estimate only the requested lag classes
+        if self.estimator in _FUSED_ESTIMATORS:
+            if axis == 'space':
+                marginal = self._fused_estimate(np.arange(self.x_lags), [lag])[:, 0]
+            else:
+                marginal = self._fused_estimate([lag], np.arange(self.t_lags))[0]
+        elif axis == 'space':
+            marginal = np.fromiter(
                 (self.estimator(self._get_member(i, lag)) for i in range(self.x_lags)),
                 dtype=float
             )
-        elif axis.lower() == 'time' or axis.lower() == 't':
-            return np.fromiter(
+        else:
+            marginal = np.fromiter(
                 (self.estimator(self._get_member(lag, j)) for j in range(self.t_lags)),
                 dtype=float
             )
-        else:
-            raise ValueError("axis can either be 'space' or 'time'.")
+
+        marginal.flags.writeable = False
+        self._marginal_cache[key] = marginal
+        return marginal
+
+    def _compute_marginals(self, lag=0):
+        """Space and time marginal variograms
+
+        Returns the space marginal variogram at time lag class ``lag`` and
+        the time marginal variogram at space lag class ``lag`` in one pass.
+        Both are sliced from the
+
+        :func:`experimental <skgstat.SpaceTimeVariogram.experimental>`
+        variogram and stored in the marginal cache used by
+        :func:`get_marginal <skgstat.SpaceTimeVariogram.get_marginal>`.
+
+        Parameters
+        ----------
+        lag : int
+            Index of the lag class on the other axis.
+
+        Returns
+        -------
+        variograms : tuple
+            The space and the time marginal variogram as read-only
+            numpy.arrays.
+
+        """
+        grid = self.experimental.reshape((self.x_lags, self.t_lags))
+        vx, vt = grid[:, lag], grid[lag, :]
+
+        self._marginal_cache[('space', lag)] = vx
+        self._marginal_cache[('time', lag)] = vt
+        return vx, vt
 
     def _get_member(self, xlag, tlag):
-        x_idxs = self._xgroups == xlag
-        t_idxs = self._tgroups == tlag
-        return self._diff[np.where(x_idxs)[0]][:, np.where(t_idxs)[0]].flatten()
+        i, j = self._get_group_pairs(axis='space', lag=xlag)
+        ti, tj = self._get_group_pairs(axis='time', lag=tlag)
+        return self._get_diff(i, j, ti, tj).ravel()
 
     # ------------------------------------------------------------------------ #
     #                             PLOTTING                                     #
@@ -1147,6 +1757,7 @@ class SpaceTimeVariogram:
             * **surface**
             * **contour**
             * **contourf**
+            * **contourf+contour**
             * **matrix**
             * **marginals**
 
@@ -1183,6 +1794,8 @@ class SpaceTimeVariogram:
             return self.contour(ax=ax)
         elif kind.lower() == 'contourf':
             return self.contourf(ax=ax)
+        elif kind.lower() == 'contourf+contour':
+            return self._plot2d(kind='contourf+contour', ax=ax, **kwargs)
         elif kind.lower() == 'matrix' or kind.lower() == 'mat':
             raise NotImplementedError
         elif kind.lower() == 'marginals':
@@ -1216,7 +1829,9 @@ class SpaceTimeVariogram:
             the distance from the viewport for illustration reasons.
         kwargs : dict
             Other kwargs accepted are only ``color`` as an alias for ``c``
-            and ``figsize``, if ax is None. Anything else will be ignored.
+            and ``figsize``, if ax is None. ``draw=True`` requests a redraw
+            of the canvas after plotting, by default the drawing is left to
+            the caller. Anything else will be ignored.
 
         Returns
         -------
@@ -1256,7 +1871,7 @@ class SpaceTimeVariogram:
         space and time lag coordinate. Unlike
         :func:`scatter <skgstat.SpaceTimeVariogram.scatter>` the semivariance
         will not be scattered as points but rather as a surface plot. The
-        surface is approximated by (Delauney) triangulation of the z-axis.
+        surface is spanned over the regular bin meshgrid.
 
         Parameters
         ----------
@@ -1275,7 +1890,9 @@ class SpaceTimeVariogram:
             being completely transparent.
         kwargs : dict
             Other kwargs accepted are only ``color`` as an alias for ``c``
-            and ``figsize``, if ax is None. Anything else will be ignored.
+            and ``figsize``, if ax is None. ``draw=True`` requests a redraw
+            of the canvas after plotting, by default the drawing is left to
+            the caller. Anything else will be ignored.
 
         Returns
         -------
@@ -1337,7 +1954,8 @@ class SpaceTimeVariogram:
             grid for visual reasons. The density of this plot can be set by
             zoom_factor. A factor of 10 will enlarge each of the axes by 10.
             Higher zoom_factors result in smoother contours, but are
-            expansive in calculation time.
+            expansive in calculation time. The zoomed grid is limited to
+            2048 nodes along each axis.
         levels : int
             Number of levels to be formed for finding contour lines. More
             levels result in more detailed plots, but are expansive in terms
@@ -1349,16 +1967,21 @@ class SpaceTimeVariogram:
             parameter.
         method : str
             The method used for densifying the meshgrid. Can be one of
-            'fast' or 'precise'. Fast will use the scipy.ndimage.zoom method
-            to incresae the node density. This is fast, but cannot
-            interpolate *behind* any NaN occurance. 'Precise' performs an
-            actual linear interpolation between the nodes using
-            scipy.interpolate.griddata. This takes more time, but the result
-            is less smoothed out.
+            'fast', 'precise' or 'cubic'. Fast will use the
+            scipy.ndimage.zoom method to incresae the node density. This is
+            fast, but cannot interpolate *behind* any NaN occurance.
+            'Precise' performs an actual linear interpolation between the
+            nodes using scipy.interpolate.griddata. This takes more time, but
+            the result is less smoothed out. 'Cubic' uses a piecewise cubic
+            scipy.interpolate.CloughTocher2DInterpolator on the same
+            triangulation for smoother contours.
         kwargs : dict
             Other arguments that can be specific to *contour* or *contourf*
             type. Accepts *xlabel*, *ylabel*, *xlim* and *ylim* as of this
-            writing.
+            writing. *zoom_order* sets the spline order of the 'fast'
+            method and defaults to 1. Orders above 1 use a prefiltered
+            spline through the nodes, thus a single NaN spreads over the
+            whole grid.
 
         Returns
         -------
@@ -1396,7 +2019,8 @@ class SpaceTimeVariogram:
             grid for visual reasons. The density of this plot can be set by
             zoom_factor. A factor of 10 will enlarge each of the axes by 10.
             Higher zoom_factors result in smoother contours, but are
-            expansive in calculation time.
+            expansive in calculation time. The zoomed grid is limited to
+            2048 nodes along each axis.
         levels : int
             Number of levels to be formed for finding contour lines. More
             levels result in more detailed plots, but are expansive in terms
@@ -1406,16 +2030,21 @@ class SpaceTimeVariogram:
             parameter. Can be any valid color range supported by matplotlib.
         method : str
             The method used for densifying the meshgrid. Can be one of
-            'fast' or 'precise'. Fast will use the scipy.ndimage.zoom method
-            to incresae the node density. This is fast, but cannot
-            interpolate *behind* any NaN occurance. 'Precise' performs an
-            actual linear interpolation between the nodes using
-            scipy.interpolate.griddata. This takes more time, but the result
-            is less smoothed out.
+            'fast', 'precise' or 'cubic'. Fast will use the
+            scipy.ndimage.zoom method to incresae the node density. This is
+            fast, but cannot interpolate *behind* any NaN occurance.
+            'Precise' performs an actual linear interpolation between the
+            nodes using scipy.interpolate.griddata. This takes more time, but
+            the result is less smoothed out. 'Cubic' uses a piecewise cubic
+            scipy.interpolate.CloughTocher2DInterpolator on the same
+            triangulation for smoother contours.
         kwargs : dict
             Other arguments that can be specific to *contour* or *contourf*
             type. Accepts *xlabel*, *ylabel*, *xlim* and *ylim* as of this
-            writing.
+            writing. *zoom_order* sets the spline order of the 'fast'
+            method and defaults to 1. Orders above 1 use a prefiltered
+            spline through the nodes, thus a single NaN spreads over the
+            whole grid.
 
         Returns
         -------
@@ -1435,7 +2064,7 @@ class SpaceTimeVariogram:
         used_backend = plotting.backend()
 
         if used_backend == 'matplotlib':
-            return plotting.matplotlib_plot_2d(self, kind=kind, ax=ax, zoom_factor=zoom_factor, level=10, method=method, **kwargs)
+            return plotting.matplotlib_plot_2d(self, kind=kind, ax=ax, zoom_factor=zoom_factor, levels=levels, method=method, **kwargs)
         elif used_backend == 'plotly':
             return plotting.plotly_plot_2d(self, kind=kind, fig=ax, **kwargs)
 
@@ -1487,7 +2116,9 @@ class SpaceTimeVariogram:
         """
         # handle plot
         if not plot:
-            raise DeprecationWarning('The plot parameter will be removed.')
+            warnings.warn(
+                'The plot parameter will be removed.', DeprecationWarning
+            )
             return (
                 self.XMarginal.experimental,
                 self.TMarginal.experimental
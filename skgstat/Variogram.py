@@ -4,6 +4,7 @@ Variogram class
 import copy
 import os
 import warnings
+from functools import partial
 
 import numpy as np
 from pandas import DataFrame
@@ -487,11 +488,11 @@ class Variogram(object):
         elif bin_func.lower() == 'uniform':
             self._bin_func = binning.uniform_count_lags
         elif isinstance(bin_func, str):
-            # define a helper wrapper
-            def wrapper(distances, n, maxlag):
-                return binning.auto_derived_lags(distances, bin_func.lower(), maxlag)
-
-            self._bin_func = wrapper
+            # define a picklable helper wrapper
+            self._bin_func = partial(
+                binning._auto_derived_lags_wrapper,
+                method_name=bin_func.lower()
+            )
             self._n_lags = None
         elif callable(bin_func):
             self._bin_func = bin_func
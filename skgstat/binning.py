@@ -114,3 +114,14 @@ def auto_derived_lags(distances, method_name, maxlag):
     edges = np.histogram_bin_edges(d, bins=method_name)[1:]
 
     return edges, len(edges)
+
+
+def _auto_derived_lags_wrapper(distances, n, maxlag, method_name='fd'):
+    """
+    Wrap :func:`auto_derived_lags <skgstat.binning.auto_derived_lags>` into
+    the (distances, n, maxlag) signature of the other binning functions.
+    n is ignored. Use functools.partial to set the method_name. Unlike a
+    closure, the partial can be pickled.
+
+    """
+    return auto_derived_lags(distances, method_name, maxlag)
@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 
 try:
     import plotly.graph_objects as go
@@ -25,6 +24,8 @@ def __calc_plot_data(stvariogram, **kwargs):
 
 
 def matplotlib_marginal(stvariogram, axes=None, sharey=True, include_model=False, **kwargs):
+    import matplotlib.pyplot as plt
+
     # check if an ax needs to be created
     if axes is None:
         fig, axes = plt.subplots(1, 2, figsize=kwargs.get('figsize', (12, 6)),sharey=sharey)
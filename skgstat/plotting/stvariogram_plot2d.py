@@ -1,58 +1,243 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.ndimage.interpolation import zoom
-from scipy.interpolate import griddata
+from numba import njit
 
 try:
     import plotly.graph_objects as go
 except ImportError:
     pass
 
+# number of interpolated grids kept on each SpaceTimeVariogram and the
+# maximum number of bytes they may use together
+ZI_CACHE_SIZE = 4
+ZI_CACHE_BYTES = 32 * 1024 ** 2
 
-def matplotlib_plot_2d(stvariogram, kind='contour', ax=None, zoom_factor=100., levels=10, method='fast', **kwargs):
-    # get or create the figure
-    if ax is not None:
-        fig = ax.get_figure()
+# maximum number of nodes along each axis of the zoomed grid
+MAX_ZOOM_NODES = 2048
+
+
+@njit(cache=True)
+def _nanminmax(a):
+    """
+    Return the minimum and maximum of a, ignoring NaN, in a single pass.
+    NaN is returned for both, if a has no finite values.
+
+    """
+    mn = np.inf
+    mx = -np.inf
+    for v in a.flat:
+        if v == v:
+            if v < mn:
+                mn = v
+            if v > mx:
+                mx = v
+    if mn > mx:
+        return np.nan, np.nan
+    return mn, mx
+
+
+def __triangulation(stvariogram, x, y):
+    """
+    Return the Delaunay triangulation of the bin meshgrid (x, y). It is
+    cached on the SpaceTimeVariogram and reused as long as the bins do not
+    change.
+
+    """
+    key = (stvariogram.xbins.tobytes(), stvariogram.tbins.tobytes())
+    cache = stvariogram._bin_tri
+    if cache is None or cache[0] != key:
+        from scipy.spatial import Delaunay
+
+        cache = (key, Delaunay(np.column_stack((x, y))))
+        stvariogram._bin_tri = cache
+
+    return cache[1]
+
+
+def __cubic_interpolator(stvariogram, x, y, z):
+    """
+    Return a CloughTocher2DInterpolator of z on the bin meshgrid (x, y).
+    It is built on the cached triangulation of the bins and reused as long
+    as the bins and the experimental variogram do not change.
+
+    """
+    key = (
+        stvariogram.xbins.tobytes(),
+        stvariogram.tbins.tobytes(),
+        hash(z.tobytes())
+    )
+    cache = stvariogram._cubic_interp
+    if cache is None or cache[0] != key:
+        from scipy.interpolate import CloughTocher2DInterpolator
+
+        tri = __triangulation(stvariogram, x, y)
+        cache = (key, CloughTocher2DInterpolator(tri, z))
+        stvariogram._cubic_interp = cache
+
+    return cache[1]
+
+
+def __precise_weights(stvariogram, x, y, xxi, yyi):
+    """
+    Return the vertices, barycentric weights and outside mask for a linear
+    interpolation from the bin meshgrid (x, y) onto (xxi, yyi). This is the
+    same interpolation as griddata(method='linear'), but the weights are
+    cached on the SpaceTimeVariogram and reused as long as the bins and
+    the zoomed grid do not change. Weights larger than ZI_CACHE_BYTES are
+    not cached.
+
+    """
+    key = (stvariogram.xbins.tobytes(), stvariogram.tbins.tobytes(), xxi.shape)
+    cache = stvariogram._precise_interp_cache
+    if cache is not None and cache[0] == key:
+        return cache[1:]
+
+    # find the simplex of each grid point
+    tri = __triangulation(stvariogram, x, y)
+    points = np.column_stack((xxi.ravel(), yyi.ravel()))
+    simplex = tri.find_simplex(points)
+
+    # barycentric coordinates of each grid point
+    vertices = np.take(tri.simplices, simplex, axis=0)
+    transform = np.take(tri.transform, simplex, axis=0)
+    delta = points - transform[:, 2]
+    bary = np.einsum('njk,nk->nj', transform[:, :2, :], delta)
+    weights = np.hstack((bary, 1 - bary.sum(axis=1, keepdims=True)))
+    outside = simplex < 0
+
+    # the weights take several times the bytes of the grid they produce
+    nbytes = vertices.nbytes + weights.nbytes + outside.nbytes
+    if nbytes <= ZI_CACHE_BYTES:
+        stvariogram._precise_interp_cache = (key, vertices, weights, outside)
     else:
-        fig, ax = plt.subplots(1, 1, figsize=kwargs.get('figsize', (8, 8)))
+        stvariogram._precise_interp_cache = None
+    return vertices, weights, outside
+
+
+def __interpolate(stvariogram, zoom_factor, method, zoom_order=1):
+    """
+    Zoom the bin meshgrid by zoom_factor and interpolate the experimental
+    variogram onto it, either 'fast', 'precise' or 'cubic'. The zoom is limited to
+    MAX_ZOOM_NODES nodes per axis and the 'fast' grid is interpolated with
+    spline order zoom_order in float32. Orders above 1 are prefiltered, so
+    that the spline passes through the nodes. The last ZI_CACHE_SIZE interpolated
+    grids, using at most ZI_CACHE_BYTES, are cached on the
+    SpaceTimeVariogram, keyed by the zoom factor, the method, the order,
+    the bins and the experimental variogram. The zoomed meshgrid itself is
+    cheap and rebuilt on each call.
+
+    """
+    from scipy.ndimage import zoom
+
+    method = method.lower()
+    if method not in ('fast', 'precise', 'cubic'):
+        raise ValueError("method has to be one of ['fast', 'precise', 'cubic']")
 
     # prepare the meshgrid
     xx, yy = stvariogram.meshbins
     z = stvariogram.experimental
-    x = xx.flatten()
-    y = yy.flatten()
 
+    # limit the size of the zoomed grid
+    zoom_factor = min(
+        zoom_factor, MAX_ZOOM_NODES / max(stvariogram.x_lags, stvariogram.t_lags)
+    )
+
+    key = (
+        round(zoom_factor, 6),
+        method,
+        zoom_order,
+        hash(xx.tobytes()),
+        hash(yy.tobytes()),
+        hash(z.tobytes())
+    )
     xxi = zoom(xx, zoom_factor, order=1)
     yyi = zoom(yy, zoom_factor, order=1)
 
-    # interpolation, either fast or precise
-    if method.lower() == "fast":
-        zi = zoom(z.reshape((stvariogram.t_lags, stvariogram.x_lags)), zoom_factor, order=1, prefilter=False)
-    elif method.lower() == "precise":
-        # zoom the meshgrid by linear interpolation
-        # interpolate the semivariance
-        zi = griddata((x, y), z, (xxi, yyi), method='linear')
+    cache = stvariogram._zi_cache
+    if key in cache:
+        cache.move_to_end(key)
+        return xxi, yyi, cache[key]
+
+    # interpolation, either fast, precise or cubic
+    if method == "fast":
+        z2 = stvariogram.experimental_f32.reshape((stvariogram.t_lags, stvariogram.x_lags))
+        zi = zoom(z2, zoom_factor, order=zoom_order, prefilter=zoom_order > 1, mode='nearest')
+    elif method == "precise":
+        # linear interpolation of the semivariance using the cached
+        # triangulation of the bin meshgrid
+        vertices, weights, outside = __precise_weights(stvariogram, xx.ravel(), yy.ravel(), xxi, yyi)
+        zi = np.einsum('nj,nj->n', np.take(z, vertices), weights)
+        zi[outside] = np.nan
+        zi = zi.reshape(xxi.shape)
+    else:
+        # piecewise cubic interpolation on the same triangulation
+        interp = __cubic_interpolator(stvariogram, xx.ravel(), yy.ravel(), z)
+        zi = interp((xxi, yyi))
+
+    # cache the read-only grid and drop the least recently used ones
+    zi.flags.writeable = False
+    if zi.nbytes <= ZI_CACHE_BYTES:
+        cache[key] = zi
+        while len(cache) > ZI_CACHE_SIZE or \
+                sum(grid.nbytes for grid in cache.values()) > ZI_CACHE_BYTES:
+            cache.popitem(last=False)
+
+    return xxi, yyi, zi
+
+
+def __contour_levels(stvariogram, zmax, levels):
+    """
+    Return levels evenly spaced float32 contour levels from 0 to zmax. The
+    last levels are cached on the SpaceTimeVariogram and reused as long as
+    zmax, in float32 precision, and the number of levels do not change.
+
+    """
+    key = (np.float32(zmax), levels)
+    cache = stvariogram._last_lev
+    if cache is None or cache[0] != key:
+        lev = np.linspace(0, zmax, levels, dtype=np.float32)
+        lev.flags.writeable = False
+        cache = (key, lev)
+        stvariogram._last_lev = cache
+
+    return cache[1]
+
+
+def matplotlib_plot_2d(stvariogram, kind='contour', ax=None, zoom_factor=100., levels=10, method='fast', zoom_order=1, **kwargs):
+    import matplotlib.pyplot as plt
+
+    # get or create the figure
+    if ax is not None:
+        fig = ax.get_figure()
     else:
-        raise ValueError("method has to be one of ['fast', 'precise']")
+        fig, ax = plt.subplots(1, 1, figsize=kwargs.get('figsize', (8, 8)))
+
+    # zoom the meshgrid and interpolate the semivariance
+    xxi, yyi, zi = __interpolate(stvariogram, zoom_factor, method, zoom_order)
 
     # get the bounds
-    zmin = np.nanmin(zi)
-    zmax = np.nanmax(zi)
+    zmin, zmax = _nanminmax(zi)
 
     # get the plotting parameters
-    lev = np.linspace(0, zmax, levels)
+    lev = __contour_levels(stvariogram, zmax, levels)
     c = kwargs.get('color', kwargs.get('c', 'k'))
     cmap = kwargs.get('cmap', 'RdYlBu_r')
 
     # plot
-    if kind.lower() == 'contour':
-        ax.contour(xxi, yyi, zi, colors=c, levels=lev, vmin=zmin * 1.1, vmax=zmax * 0.9, linewidths=kwargs.get('linewidths', 0.3))
-    elif kind.lower() == 'contourf':
+    kind = kind.lower()
+    if kind not in ('contour', 'contourf', 'contourf+contour'):
+        raise ValueError("%s is not a valid 2D plot" % kind)
+
+    # filled contours first, the lines are drawn on top of the same grid
+    if kind in ('contourf', 'contourf+contour'):
         C = ax.contourf(xxi, yyi, zi, cmap=cmap, levels=lev, vmin=zmin *1.1, vmax=zmax * 0.9)
         if kwargs.get('colorbar', True):
-            plt.colorbar(C, ax=ax)
-    else:
-        raise ValueError("%s is not a valid 2D plot" % kind)
+            fig.colorbar(C, ax=ax)
+    if kind in ('contour', 'contourf+contour'):
+        L = ax.contour(xxi, yyi, zi, colors=c, levels=lev, vmin=zmin * 1.1, vmax=zmax * 0.9, linewidths=kwargs.get('linewidths', 0.3))
+
+    # keep the last ContourSet, preferably the filled one, for a colorbar.
+    # It is replaced on the next plot and never pickled.
+    stvariogram._last_contourset = C if kind != 'contour' else L
 
     # some labels
     ax.set_xlabel(kwargs.get('xlabel', 'space'))
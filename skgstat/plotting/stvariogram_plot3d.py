@@ -1,6 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
 
 try:
     import plotly.graph_objects as go
@@ -24,18 +22,38 @@ def __calculate_plot_data(stvariogram, **kwargs):
         0:np.nanmax(stvariogram.tbins):nt * 1j
     ]
     model = stvariogram.fitted_model
-    lags = np.vstack((_xx.flatten(), _yy.flatten())).T
+    lags = np.vstack((_xx.ravel(), _yy.ravel())).T
     # apply the model
     _z = model(lags)
 
     return xx, yy, z, _xx, _yy, _z
 
 
+def __model_triangulation(stvariogram, _xx, _yy):
+    """
+    Return a matplotlib Triangulation of the model grid. It is cached on
+    the SpaceTimeVariogram and reused as long as the grid does not change.
+
+    """
+    from matplotlib.tri import Triangulation
+
+    key = (_xx.shape, hash(_xx.tobytes()), hash(_yy.tobytes()))
+    cache = stvariogram._mpl_tri
+    if cache is None or cache[0] != key:
+        cache = (key, Triangulation(_xx.ravel(), _yy.ravel()))
+        stvariogram._mpl_tri = cache
+
+    return cache[1]
+
+
 def matplotlib_plot_3d(stvariogram, kind='scatter', ax=None, elev=30, azim=220, **kwargs):
+    import matplotlib.pyplot as plt
+    from mpl_toolkits.mplot3d import Axes3D
+
     # get the data, spanned over a bin meshgrid
     xx, yy, z, _xx, _yy, _z = __calculate_plot_data(stvariogram, **kwargs)
-    x = xx.flatten()
-    y = yy.flatten()
+    x = xx.ravel()
+    y = yy.ravel()
 
     # some settings
     c = kwargs.get('color', kwargs.get('c', 'b'))
@@ -52,10 +70,22 @@ def matplotlib_plot_3d(stvariogram, kind='scatter', ax=None, elev=30, azim=220,
         fig = plt.figure(figsize=kwargs.get('figsize', (10, 10)))
         ax = fig.add_subplot(111, projection='3d')
 
-    # do the plot
+    # set up the axes before anything is plotted
     ax.view_init(elev=elev, azim=azim)
+    ax.set_xlabel('space')
+    ax.set_ylabel('time')
+    ax.set_zlabel('semivariance [%s]' % stvariogram.estimator.__name__)
+
+    # do the plot
     if kind == 'surf':
-        ax.plot_trisurf(x, y, z, color=c, alpha=alpha)
+        # the bins form a structured grid, no triangulation needed
+        if z.size == xx.size:
+            ax.plot_surface(
+                xx, yy, z.reshape(xx.shape), color=c, alpha=alpha,
+                linewidth=0, antialiased=False
+            )
+        else:
+            ax.plot_trisurf(x, y, z, color=c, alpha=alpha)
     elif kind == 'scatter':
         ax.scatter(x, y, z, c=c, depthshade=depthshade)
     else:
@@ -64,12 +94,12 @@ def matplotlib_plot_3d(stvariogram, kind='scatter', ax=None, elev=30, azim=220,
 
     # add the model
     if not kwargs.get('no_model', False):
-        ax.plot_trisurf(_xx.flatten(), _yy.flatten(), _z, cmap=cmap, alpha=alpha)
+        tri = __model_triangulation(stvariogram, _xx, _yy)
+        ax.plot_trisurf(tri, _z, cmap=cmap, alpha=alpha)
 
-    # labels:
-    ax.set_xlabel('space')
-    ax.set_ylabel('time')
-    ax.set_zlabel('semivariance [%s]' % stvariogram.estimator.__name__)
+    # drawing is deferred to the caller, unless requested
+    if kwargs.get('draw', False):
+        fig.canvas.draw_idle()
 
     # return
     return fig
@@ -103,8 +133,8 @@ def plotly_plot_3d(stvariogram, kind='scatter', fig=None, **kwargs):
     elif kind == 'scatter' or kwargs.get('add_points', False):
         fig.add_trace(
             go.Scatter3d(
-                x=xx.flatten(),
-                y=yy.flatten(),
+                x=xx.ravel(),
+                y=yy.ravel(),
                 z=z,
                 mode='markers',
                 opacity=alpha,
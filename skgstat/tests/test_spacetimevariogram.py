@@ -1,10 +1,15 @@
 import unittest
+import pickle
 
 import numpy as np
 from numpy.testing import assert_array_almost_equal
 import matplotlib.pyplot as plt
+from scipy.interpolate import griddata
+from scipy.ndimage import zoom
+from scipy.spatial.distance import pdist
 
 from skgstat import SpaceTimeVariogram
+from skgstat.plotting import stvariogram_plot2d
 
 
 class TestSpaceTimeVariogramInitialization(unittest.TestCase):
@@ -31,6 +36,27 @@ class TestSpaceTimeVariogramInitialization(unittest.TestCase):
             decimal=3
         )
 
+    def test_fused_estimators(self):
+        for name in ('matheron', 'cressie', 'minmax'):
+            V = SpaceTimeVariogram(self.c, self.v, estimator=name)
+
+            # apply the estimator to each lag class
+            expected = [V.estimator(vals) for vals in V.lag_classes()]
+
+            assert_array_almost_equal(V.experimental, expected, decimal=5)
+
+            # marginal variograms
+            expected = [V.estimator(V._get_member(i, 1))
+                        for i in range(V.x_lags)]
+            assert_array_almost_equal(
+                V.get_marginal('space', lag=1), expected, decimal=5
+            )
+            expected = [V.estimator(V._get_member(2, j))
+                        for j in range(V.t_lags)]
+            assert_array_almost_equal(
+                V.get_marginal('time', lag=2), expected, decimal=5
+            )
+
     def test_values_setter(self):
         V = SpaceTimeVariogram(self.c, self.v)
 
@@ -45,6 +71,125 @@ class TestSpaceTimeVariogramInitialization(unittest.TestCase):
         # assert
         assert_array_almost_equal(V.values, diff, decimal=5)
 
+    def test_values_float32(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+        expected = V.experimental
+
+        V.set_values(self.v, dtype=np.float32)
+        self.assertEqual(V.values.dtype, np.float32)
+        self.assertTrue(V.values.flags['C_CONTIGUOUS'])
+
+        assert_array_almost_equal(V.experimental, expected, decimal=3)
+
+        # small floats are stored as float32, all integers as float64
+        for dtype in (np.float16, np.float32):
+            V.values = self.v.astype(dtype)
+            self.assertEqual(V.values.dtype, np.float32)
+        for dtype in (np.int8, np.int16, np.uint16, int, np.float64):
+            V.values = self.v.astype(dtype)
+            self.assertEqual(V.values.dtype, np.float64)
+
+    def test_set_values_raises_dtype_error(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+
+        with self.assertRaises(ValueError):
+            V.set_values(self.v, dtype=np.int32)
+
+    def test_set_values_keeps_space_cache(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+        V.preprocessing()
+        xdist = V._xdist
+        xgroups = V._xgroups
+
+        # new values on the same time axis keep the space distances
+        V.values = self.v * 2
+        self.assertIs(V._xdist, xdist)
+        self.assertIs(V._xgroups, xgroups)
+
+        # a shorter time series resets the time axis
+        V.values = self.v[:, :5]
+        self.assertEqual(V.tdistance.size, 10)
+        assert_array_almost_equal(
+            V.experimental,
+            SpaceTimeVariogram(self.c, self.v[:, :5]).experimental
+        )
+
+    def test_experimental_cache(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+        exp = V.experimental
+        self.assertIs(V.experimental, exp)
+        self.assertFalse(exp.flags.writeable)
+
+        # changing the estimator or the binning dismisses the cache
+        V.estimator = 'cressie'
+        assert_array_almost_equal(
+            V.experimental,
+            SpaceTimeVariogram(self.c, self.v, estimator='cressie').experimental
+        )
+        V.x_lags = 5
+        self.assertEqual(V.experimental.size, 5 * V.t_lags)
+        self.assertEqual(V.meshbins[0].shape, (V.t_lags, 5))
+
+        # the single precision copy follows the cache
+        self.assertEqual(V.experimental_f32.dtype, np.float32)
+        assert_array_almost_equal(V.experimental_f32, V.experimental, 5)
+        V.estimator = 'matheron'
+        assert_array_almost_equal(V.experimental_f32, V.experimental, 5)
+
+    def test_values_read_only(self):
+        v = self.v.copy()
+        V = SpaceTimeVariogram(self.c, v)
+
+        # the values are copied, the input stays writeable
+        self.assertTrue(v.flags.writeable)
+        with self.assertRaises(ValueError):
+            V.values[:] = 0
+
+    def test_preprocessing_force_resets_cache(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+        exp = V.experimental
+        xx, _ = V.meshbins
+        vx = V.get_marginal('space')
+
+        V.preprocessing(force=True)
+        self.assertIsNot(V.experimental, exp)
+        self.assertIsNot(V.meshbins[0], xx)
+        self.assertIsNot(V.get_marginal('space'), vx)
+        assert_array_almost_equal(V.experimental, exp)
+
+    def test_marginal_cache(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+        vx = V.get_marginal('space')
+        self.assertIs(V.get_marginal('s', lag=0), vx)
+
+        # the marginals follow the experimental cache
+        V.estimator = 'cressie'
+        self.assertIsNot(V.get_marginal('space'), vx)
+
+    def test_marginal_without_experimental(self):
+        for estimator in ('matheron', 'genton'):
+            # genton is slow, keep the example small
+            V = SpaceTimeVariogram(
+                self.c[:15], self.v[:15, :4], x_lags=4, estimator=estimator
+            )
+            vx = V.get_marginal('space', lag=1)
+            vt = V.get_marginal('time', lag=1)
+
+            # only the requested lag classes are estimated
+            self.assertIsNone(V._experimental)
+
+            grid = V.experimental.reshape((V.x_lags, V.t_lags))
+            assert_array_almost_equal(vx, grid[:, 1])
+            assert_array_almost_equal(vt, grid[1, :])
+
+    def test_marginals_no_plot_warns(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+
+        with self.assertWarns(DeprecationWarning):
+            vx, vt = V.marginals(plot=False)
+        assert_array_almost_equal(vx, V.XMarginal.experimental)
+        assert_array_almost_equal(vt, V.TMarginal.experimental)
+
     def test_set_values_raises_AttributeError(self):
         V = SpaceTimeVariogram(self.c, self.v)
 
@@ -111,6 +256,14 @@ class TestSpaceTimeVariogramArgumets(unittest.TestCase):
         # with jaccard, all shoud disagree
         self.assertTrue(all([_ == 1. for _ in V.tdistance]))
 
+    def test_tdist_fast_path(self):
+        t = np.stack((np.arange(5), np.zeros(5)), axis=1)
+
+        # the closed form j - i has to match scipy for all line metrics
+        for metric in ('euclidean', 'cityblock', 'chebyshev', 'minkowski'):
+            V = SpaceTimeVariogram(self.c, self.v, tdist_func=metric)
+            assert_array_almost_equal(V.tdistance, pdist(t, metric))
+
     def test_tdist_func_raises_ValueError(self):
         with self.assertRaises(ValueError) as e:
             V = SpaceTimeVariogram(self.c, self.v)
@@ -153,6 +306,72 @@ class TestSpaceTimeVariogramArgumets(unittest.TestCase):
                 str(e), "Only 'max' supported as string argument."
             )
 
+    def test_maxlag_from_distance(self):
+        V = SpaceTimeVariogram(self.c, self.v, maxlag='median')
+        self.assertAlmostEqual(V.maxlag, np.median(V.xdistance))
+
+        V.maxlag = 'mean'
+        self.assertAlmostEqual(V.maxlag, np.mean(V.xdistance))
+
+        V.maxlag = 0.5
+        self.assertAlmostEqual(V.maxlag, 0.5 * np.max(V.xdistance))
+
+        # changing the distance function has to reset the cached values
+        V.xdist_func = 'cityblock'
+        V.maxlag = 'median'
+        self.assertAlmostEqual(V.maxlag, np.median(V.xdistance))
+
+    def test_calc_diff(self):
+        c, v = self.c[:12], self.v[:12, :5]
+        m, n = v.shape
+        pairs = [(i, j) for i in range(m) for j in range(i + 1, m)]
+        tpairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+
+        for dtype, n_jobs in ((np.float64, None), (np.float32, None), (np.float64, 2)):
+            V = SpaceTimeVariogram(c, v.astype(dtype), n_jobs=n_jobs)
+            V._calc_diff(force=True)
+
+            vals = V.values
+            expected = np.array([
+                [abs(vals[xi, ti] - vals[xj, tj]) for ti, tj in tpairs]
+                for xi, xj in pairs
+            ])
+            self.assertEqual(V._diff.dtype, dtype)
+            assert_array_almost_equal(V._diff, expected, decimal=5)
+
+    def test_n_jobs(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+        expected = V.experimental
+
+        V.n_jobs = 1
+        assert_array_almost_equal(V.experimental, expected)
+
+        # numpy integers are fine, booleans are not
+        V.n_jobs = np.int64(2)
+        self.assertEqual(V.n_jobs, 2)
+        self.assertIs(type(V.n_jobs), int)
+
+        for n in (0, True, 2.0):
+            with self.assertRaises(ValueError):
+                V.n_jobs = n
+
+    def test_pickle(self):
+        V = SpaceTimeVariogram(self.c, self.v, xbins='scott', tbins='fd')
+        V2 = pickle.loads(pickle.dumps(V))
+
+        assert_array_almost_equal(V.xbins, V2.xbins)
+        assert_array_almost_equal(V.experimental, V2.experimental)
+
+        # all cached arrays are read-only again
+        V.get_marginal('space')
+        V2 = pickle.loads(pickle.dumps(V))
+        cached = [V2.values, V2.experimental, V2.lag_groups('space')]
+        cached += list(V2.x_pairs) + list(V2.t_pairs) + list(V2.meshbins)
+        cached += list(V2._x_group_pairs) + list(V2._t_group_pairs)
+        cached += list(V2._marginal_cache.values())
+        for arr in cached:
+            self.assertFalse(arr.flags.writeable)
+
     def test_autoset_lag_bins(self):
         V = SpaceTimeVariogram(self.c, self.v, xbins='scott', tbins='fd')
 
@@ -198,6 +417,160 @@ class TestSpaceTimeVariogramPlots(unittest.TestCase):
                 'of mpl_toolkis.mplot3d.Axes3D.'
             )
 
+    def test_pickle_drops_plot_caches(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+        V.contourf(zoom_factor=10, method='precise')
+        plt.close('all')
+        self.assertEqual(len(V._zi_cache), 1)
+
+        V2 = pickle.loads(pickle.dumps(V))
+        self.assertEqual(len(V2._zi_cache), 0)
+        self.assertIsNone(V2._precise_interp_cache)
+        self.assertIsNone(V2._last_contourset)
+        self.assertFalse(V2.values.flags.writeable)
+
+    def test_last_contourset(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+        fig = V.contourf(zoom_factor=10)
+        self.assertIs(V._last_contourset.axes.figure, fig)
+
+        # the next plot releases the previous figure
+        plt.close(fig)
+        fig2 = V.contour(zoom_factor=10)
+        self.assertIs(V._last_contourset.axes.figure, fig2)
+        plt.close(fig2)
+
+    def test_fast_zoom_passes_through_nodes(self):
+        V = SpaceTimeVariogram(self.c, self.v, x_lags=6)
+        nodes = V.experimental.reshape((V.t_lags, V.x_lags))
+
+        # a 6x6 grid zoomed to 31x31 has a node at every 6th point
+        for order in (1, 3):
+            V.contour(zoom_factor=31 / 6, zoom_order=order)
+            plt.close('all')
+            zi = next(reversed(V._zi_cache.values()))
+            self.assertEqual(zi.shape, (31, 31))
+            assert_array_almost_equal(zi[::6, ::6], nodes, decimal=4)
+
+    def _zoomed(self, V, method, zoom_factor=5):
+        # plot and return the zoomed meshgrid and the interpolated grid
+        V.contour(zoom_factor=zoom_factor, method=method)
+        plt.close('all')
+        xx, yy = V.meshbins
+        zi = next(reversed(V._zi_cache.values()))
+        return zoom(xx, zoom_factor, order=1), zoom(yy, zoom_factor, order=1), zi
+
+    def test_precise_matches_griddata(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+
+        for _ in range(2):
+            xx, yy = V.meshbins
+            xxi, yyi, zi = self._zoomed(V, 'precise')
+            expected = griddata(
+                (xx.ravel(), yy.ravel()), V.experimental, (xxi, yyi), method='linear'
+            )
+            assert_array_almost_equal(zi, expected)
+
+            # new values reuse the triangulation
+            np.random.seed(1)
+            V.values = np.random.normal(10, 5, (50, 7))
+
+    def test_precise_outside_hull_is_nan(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+        xx, yy = V.meshbins
+        x, y = xx.ravel(), yy.ravel()
+
+        # grid reaching beyond the bins on both axes
+        xxi, yyi = np.meshgrid(
+            np.linspace(-1, xx.max() * 1.2, 30),
+            np.linspace(-1, yy.max() * 1.2, 20)
+        )
+        precise_weights = getattr(stvariogram_plot2d, '__precise_weights')
+        vertices, weights, outside = precise_weights(V, x, y, xxi, yyi)
+        zi = np.einsum('nj,nj->n', np.take(V.experimental, vertices), weights)
+        zi[outside] = np.nan
+
+        expected = griddata((x, y), V.experimental, (xxi, yyi), method='linear')
+        self.assertTrue(outside.any())
+        assert_array_almost_equal(zi.reshape(xxi.shape), expected)
+
+    def test_precise_weights_cache_is_bounded(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+        V.contour(zoom_factor=5, method='precise')
+        plt.close('all')
+        self.assertIsNotNone(V._precise_interp_cache)
+
+        # weights above the byte budget are not kept on the instance
+        budget = stvariogram_plot2d.ZI_CACHE_BYTES
+        stvariogram_plot2d.ZI_CACHE_BYTES = 1024
+        try:
+            V.contour(zoom_factor=6, method='precise')
+            plt.close('all')
+        finally:
+            stvariogram_plot2d.ZI_CACHE_BYTES = budget
+        self.assertIsNone(V._precise_interp_cache)
+
+    def test_zi_cache_lru(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+        for zoom_factor in (2, 3, 4, 5, 6):
+            V.contour(zoom_factor=zoom_factor)
+        plt.close('all')
+
+        # only the last ZI_CACHE_SIZE grids are kept
+        self.assertEqual(len(V._zi_cache), stvariogram_plot2d.ZI_CACHE_SIZE)
+        self.assertEqual([k[0] for k in V._zi_cache], [3, 4, 5, 6])
+
+        # a hit moves the grid to the end
+        V.contour(zoom_factor=3)
+        plt.close('all')
+        self.assertEqual([k[0] for k in V._zi_cache], [4, 5, 6, 3])
+
+    def test_zoom_is_clamped(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+        max_nodes = stvariogram_plot2d.MAX_ZOOM_NODES
+        stvariogram_plot2d.MAX_ZOOM_NODES = 40
+        try:
+            V.contour(zoom_factor=100)
+            plt.close('all')
+        finally:
+            stvariogram_plot2d.MAX_ZOOM_NODES = max_nodes
+
+        zi = next(reversed(V._zi_cache.values()))
+        self.assertEqual(max(zi.shape), 40)
+
+    def test_nanminmax(self):
+        a = np.array([[np.nan, 3., -2.], [5., np.nan, 1.]])
+        self.assertEqual(stvariogram_plot2d._nanminmax(a), (-2., 5.))
+
+        mn, mx = stvariogram_plot2d._nanminmax(np.full((3, 3), np.nan))
+        self.assertTrue(np.isnan(mn) and np.isnan(mx))
+
+    def test_contourf_and_contour(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+        filled = len(V.contourf(colorbar=False).axes[0].collections)
+        fig = V.plot(kind='contourf+contour', colorbar=False)
+
+        # the lines are drawn on top of the filled contours of one grid
+        self.assertGreater(len(fig.axes[0].collections), filled)
+        self.assertTrue(V._last_contourset.filled)
+        self.assertEqual(len(V._zi_cache), 1)
+        plt.close('all')
+
+    def test_cubic_matches_griddata(self):
+        V = SpaceTimeVariogram(self.c, self.v)
+
+        for _ in range(2):
+            xx, yy = V.meshbins
+            xxi, yyi, zi = self._zoomed(V, 'cubic')
+            expected = griddata(
+                (xx.ravel(), yy.ravel()), V.experimental, (xxi, yyi), method='cubic'
+            )
+            assert_array_almost_equal(zi, expected)
+
+            # new values reuse the triangulation
+            np.random.seed(1)
+            V.values = np.random.normal(10, 5, (50, 7))
+
 
 if __name__ == '__main__':
     unittest.main()